@@ -1,3 +1,5 @@
+from copy import copy
+
 try:
     from sage.rings.complex_mpfr import ComplexField
 except ModuleNotFoundError: # versions of sage older than 9.3
@@ -7,8 +9,9 @@ from sage.rings.polynomial.polynomial_ring_constructor import PolynomialRing
 from sage.modules.free_module import VectorSpace
 from sage.modules.free_module_element import vector
 from sage.matrix.constructor import matrix
-from sage.matrix.special import identity_matrix
+from sage.matrix.special import identity_matrix, block_matrix
 from sage.misc.misc_c import prod
+from sage.parallel.decorate import parallel
 
 from ore_algebra.analytic.accuracy import PrecisionError
 from .utilities import roots, XGCD, customized_accuracy
@@ -131,31 +134,42 @@ def row_echelon_form(mat, *, transformation=False, pivots=False, prec_pivots={})
     """
 
     m, n, C = mat.nrows(), mat.ncols(), mat.base_ring()
-    T = identity_matrix(C, m)
+    T, R = identity_matrix(C, m), copy(mat) # R = T*mat is kept along the way
     p = prec_pivots.copy()
     r = len(p)
 
     for j in p:
-        col = T*vector(mat[:,j])
-        for i in range(r, m):
-            T[i] = [T[i,k] - col[i]*T[p[j],k] for k in range(m)]
+        col, pj = vector(R[:,j]), p[j]
+        if r < m:
+            c = matrix(C, m - r, 1, list(col[r:]))
+            T[r:,:] = T[r:,:] - c*T[pj:pj+1,:]
+            R[r:,:] = R[r:,:] - c*R[pj:pj+1,:]
 
     for j in range(n):
         if not j in p:
-            r, col = len(p), T*vector(mat[:,j])
-            i = max((l for l in range(r, m) if col[l].is_nonzero()), \
-            key=lambda l: col[l].below_abs(), default=None)
+            r, col = len(p), vector(R[:,j])
+            i, best = None, None
+            for l in range(r, m):
+                c = col[l]
+                if c.is_nonzero():
+                    mag = c.below_abs()
+                    if i is None or mag > best: i, best = l, mag
             if i is not None:
                 p[j] = r
-                T[i], T[r], col[i], col[r] = T[r], T[i], col[r], col[i]
-                T[r] = [T[r,k]/col[r] for k in range(m)]
-                for l in range(r+1, m):
-                    T[l] = [T[l,k] - col[l]*T[r,k] for k in range(m)]
-
-    R = T*mat
-    for j in p:
-        R[p[j],j] = 1
-        for i in range(p[j]+1, m): R[i,j] = 0
+                T.swap_rows(i, r)
+                R.swap_rows(i, r)
+                col[i], col[r] = col[r], col[i]
+                inv = ~col[r]
+                T.rescale_row(r, inv)
+                R.rescale_row(r, inv)
+                if r + 1 < m: # rank one update of the rows below the pivot
+                    c = matrix(C, m - r - 1, 1, list(col[r+1:]))
+                    T[r+1:,:] = T[r+1:,:] - c*T[r:r+1,:]
+                    R[r+1:,:] = R[r+1:,:] - c*R[r:r+1,:]
+
+    for j, rj in p.items():
+        R[rj,j] = 1
+        if rj + 1 < m: R[rj+1:,j] = 0
 
     if transformation:
         if T.det().contains_zero():
@@ -249,10 +263,32 @@ def orbit(Mats, vec, *, transition=False, pivots=False):
         if transition: return [], []
         else: return []
 
+    if len(Mats)==1: # Krylov iteration: one new vector at most by step
+        mat, b = Mats[0], [b[0]]
+        while len(b) < n:
+            w = mat*b[-1]
+            if transition: U = mat*T[-1]
+            for j in p:
+                c = w[j]
+                w = w - c*b[p[j]]
+                if transition: U = U - c*T[p[j]]
+            k = next((l for l in range(n) if not l in p and w[l].is_nonzero()), None)
+            if k is None: break
+            inv = ~w[k]
+            w = inv*w
+            w[k] = 1
+            for j in p: w[j] = 0
+            p[k] = len(b)
+            b.append(w)
+            if transition: T.append(inv*U)
+
     r, new = 1, range(0, 1)
-    while len(new) > 0 and r < n:
+    if len(Mats) > 1: MatsT = [mat.transpose() for mat in Mats]
+    while len(Mats) > 1 and len(new) > 0 and r < n:
 
-        b = b.stack(matrix([mat*vector(b[i]) for mat in Mats for i in new]))
+        # the rows of B*mat.transpose() are the mat*b[i] for i in new
+        B = b.matrix_from_rows(list(new))
+        b = block_matrix(len(Mats) + 1, 1, [b] + [B*matT for matT in MatsT], subdivide=False)
         if transition:
             T.extend([mat*T[i] for mat in Mats for i in new])
 
@@ -332,9 +368,12 @@ def generated_algebra(Mats, _check=False):
 
     while len(new)>0 and r<n**2:
 
-        b = b.stack(matrix([(matrix(n,b[i])*matrix(n,b[j])).list() for i in range(r) for j in new]))
+        # A stacks the r matrices of the basis, so that A*matrix(n, b[j])
+        # stacks their products by the j-th one
+        A = matrix(C, r*n, n, b.list())
+        b = block_matrix(len(new) + 1, 1, [b] + [matrix(C, r, n**2, (A*matrix(n, b[j])).list()) for j in new], subdivide=False)
         if _check:
-            l.extend(l[i]*l[j] for i in range(r) for j in new)
+            l.extend(l[i]*l[j] for j in new for i in range(r))
             b, T, p = row_echelon_form(b, transformation=True, pivots=True, prec_pivots = p)
             l = [sum(T[i,j]*l[j] for j in range(len(l))) for i in range(len(p))]
         else: b, p = row_echelon_form(b, pivots=True, prec_pivots = p)
@@ -527,11 +566,12 @@ class Splitting():
     r"""
     """
 
-    def __init__(self, Mats):
+    def __init__(self, Mats, ncpus=1):
 
         self.n = Mats[0].nrows()
         self.C = Mats[0].base_ring()
         self.I = identity_matrix(self.C, self.n)
+        self.ncpus = ncpus           # number of processes used by refine
 
         self.matrices = Mats.copy()
         self.partition = [self.n]
@@ -542,11 +582,16 @@ class Splitting():
 
     def refine(self, mat):
 
-        new_dec, s = [], 0
+        blocs, s = [], 0
         for j, nj in enumerate(self.partition):
-            new_dec.append(gen_eigenspaces(mat.submatrix(s, s, nj, nj), projections=True))
+            blocs.append(mat.submatrix(s, s, nj, nj))
             s = s + nj
 
+        if self.ncpus>1 and len(blocs)>1:
+            new_dec = _parallel_gen_eigenspaces(blocs, self.ncpus)
+        else:
+            new_dec = [gen_eigenspaces(bloc, projections=True) for bloc in blocs]
+
         self.partition = [space['multiplicity'] for bloc in new_dec for space in bloc]
         self.projections = [p*space['projection'](mat)*p for j, p in enumerate(self.projections) for space in new_dec[j]]
 
@@ -561,8 +606,14 @@ class Splitting():
             invT = ~T
         except ZeroDivisionError:
             raise PrecisionError("Cannot compute the transition to the old basis from the new one.")
-        self.matrices = [invT*M*T for M in self.matrices]
-        self.projections = [invT*p*T for p in self.projections]
+
+        # all the conjugations invT*M*T at once, through two products with
+        # the matrices laid side by side and then on top of each other
+        n, k, Mats = self.n, len(self.matrices), self.matrices + self.projections
+        L = invT*block_matrix(1, len(Mats), Mats, subdivide=False)
+        L = block_matrix(len(Mats), 1, [L.submatrix(0, i*n, n, n) for i in range(len(Mats))], subdivide=False)*T
+        Mats = [L.submatrix(i*n, 0, n, n) for i in range(len(Mats))]
+        self.matrices, self.projections = Mats[:k], Mats[k:]
 
         return
 
@@ -573,7 +624,7 @@ class Splitting():
         s = 0
         for j, nj in enumerate(self.partition):
             if nj==1:
-                p = self.projections[j]
+                p = copy(self.projections[j]) # self.projections is used by refine
                 p[s,s] = p[s,s] - self.C.one()
                 err = max(sum(p[i,j].above_abs() for j in range(self.n)) for i in range(self.n))
                 err = self.C.zero().add_error(err)
@@ -634,8 +685,9 @@ class Splitting():
                     lc = linear_combination(vec1, V, p)
                     M = sum(cj*T[j] for j, cj in enumerate(lc))
                     mat = M.matrix_from_rows_and_columns(ind, ind)
-                    if len(eigenvalues(mat))>1: return ('new_matrix', M)
-                    K = intersect_eigenvectors(K, mat)
+                    eigvals = eigenvalues(mat)
+                    if len(eigvals)>1: return ('new_matrix', M)
+                    K = intersect_eigenvectors(K, mat, eigvals=eigvals)
 
             s = s + nj
 
@@ -643,23 +695,54 @@ class Splitting():
 
 
 
+def _parallel_gen_eigenspaces(Mats, ncpus):
+
+    r"""
+    Return [gen_eigenspaces(mat, projections=True) for mat in Mats], the
+    independent computations being distributed over "ncpus" forked processes.
+    """
+
+    @parallel(ncpus=ncpus)
+    def task(i):
+        return gen_eigenspaces(Mats[i], projections=True)
+
+    output = dict((args[0], out) for (args, _), out in task(list(range(len(Mats)))))
+
+    # a failed child only returns a string: the computation is done again in
+    # this process in order to get the actual result or exception
+    for i in range(len(Mats)):
+        if not isinstance(output.get(i), list):
+            output[i] = gen_eigenspaces(Mats[i], projections=True)
+
+    return [output[i] for i in range(len(Mats))]
+
+
+
 def linear_combination(vec, Vecs, p):
 
-    n = len(Vecs)
-    p = {value:key for key, value in p.items()}
-    lc = [0]*n
-    for i in range(n-1, -1, -1):
-        x = vec[p[i]]
+    r"""
+    Return the coefficients of "vec" as a linear combination of "Vecs".
+
+    Assumption: the vectors of Vecs are in row echelon form with respect to the
+    pivots p (as in the output of orbit), so that their restriction to the
+    pivot columns is a unipotent upper triangular matrix. The coefficients are
+    obtained by forward substitution in the order of the pivots.
+    """
+
+    cols = sorted(p, key=lambda j: p[j])
+    lc = []
+    for i, j in enumerate(cols):
+        x = vec[j]
         vec = vec - x*Vecs[i]
-        lc[p[i]] = x
+        lc.append(x)
 
     return lc
 
 
 
-def intersect_eigenvectors(K, mat):
+def intersect_eigenvectors(K, mat, eigvals=None):
 
-    eigvals = eigenvalues(mat)
+    if eigvals is None: eigvals = eigenvalues(mat)
     if len(eigvals)>1:
         raise PrecisionError('This matrix seems have several eigenvalues.')
     K = K.intersection((mat-eigvals[0]*(mat.parent().one())).right_kernel())
@@ -668,7 +751,7 @@ def intersect_eigenvectors(K, mat):
 
 
 
-def invariant_subspace(Mats, *, verbose=False):
+def invariant_subspace(Mats, *, verbose=False, ncpus=1):
 
     r"""
     Return either a nontrivial subspace invariant under the action of the
@@ -683,13 +766,17 @@ def invariant_subspace(Mats, *, verbose=False):
 
     INPUT:
 
-     -- "Mats" -- list of n×n matrices
+     -- "Mats"  -- list of n×n matrices
+     -- "ncpus" -- positive integer (optional, default: 1)
 
 
     OUTPUT:
 
      -- "V" -- list of vectors of size n or None
 
+    If 'ncpus>1' is specified, the generalized eigenspaces of the different
+    blocs are computed in parallel.
+
 
     EXAMPLE::
 
@@ -705,29 +792,33 @@ def invariant_subspace(Mats, *, verbose=False):
     if Mats==[]: raise TypeError("This function requires at least one matrix.")
 
     n, C = Mats[0].nrows(), Mats[0].base_ring()
-    split = Splitting(Mats)
-    mat = sum(C(ComplexField().random_element())*M for M in split.matrices)
-    split.refine(mat)
-
-    hope = True
-    while hope:
-        if verbose: print("The partition is currently " + str(split.partition) + ".")
-        b, V = split.check_lines()
-        if b: return V
-        if verbose: print("Lines checked.")
-
-        if len(split.partition)==n: return None
-        if verbose: print("Need to check nolines.")
-
-        b, x = split.check_nolines(verbose=verbose)
-        if b=='new_matrix': split.refine(x)
-        elif b: return x
-        else: hope=False
-
-    if verbose: print("Need to compute a basis of the algebra.")
-    Mats = generated_algebra(Mats)
-    if len(Mats)==n**2:
-        return None
-    else:
+    algebra = False # whether Mats is already a basis of the algebra
+
+    for restart in range(10):
+
+        split = Splitting(Mats, ncpus=ncpus)
+        mat = sum(C(ComplexField().random_element())*M for M in split.matrices)
+        split.refine(mat)
+
+        hope = True
+        while hope:
+            if verbose: print("The partition is currently " + str(split.partition) + ".")
+            b, V = split.check_lines()
+            if b: return V
+            if verbose: print("Lines checked.")
+
+            if len(split.partition)==n: return None
+            if verbose: print("Need to check nolines.")
+
+            b, x = split.check_nolines(verbose=verbose)
+            if b=='new_matrix': split.refine(x)
+            elif b: return x
+            else: hope=False
+
+        if not algebra:
+            if verbose: print("Need to compute a basis of the algebra.")
+            Mats, algebra = generated_algebra(Mats), True
+            if len(Mats)==n**2: return None
         if verbose: print("Restart with the basis of the algebra.")
-        return invariant_subspace(Mats)
+
+    raise PrecisionError("Cannot conclude after several restarts.")
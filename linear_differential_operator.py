@@ -69,21 +69,22 @@ class LinearDifferentialOperator(PlainDifferentialOperator):
         Return True if "self" is fuchian, False otherwise.
 
         Fuch's criterion: p is a regular point of a_n*Dz^n + ... + a_0 (with a_i
-        polynomial) iff no (z-p)^{n-k}*a_k/a_n admits p as pole.
+        polynomial) iff no (z-p)^{n-k}*a_k/a_n admits p as pole. At infinity,
+        this amounts to deg(a_k) - deg(a_n) <= k - n for each nonzero a_k.
         """
 
-        coeffs = self.coefficients()
-        fac = coeffs.pop().factor()
-        for (f, m) in fac:
+        coeffs = self.list()
+        an = coeffs.pop()
+
+        dn = an.degree()
+        for k, ak in enumerate(coeffs):
+            if ak!=0 and ak.degree() - dn > k - self.n: return False
+
+        for (f, m) in an.factor():
             for k, ak in enumerate(coeffs):
                 mk = valuation(ak, f)
                 if mk - m < k - self.n: return False
 
-        dop = self.annihilator_of_composition(1/self.z)
-        for k, frac in enumerate(dop.monic().coefficients()[:-1]):
-            d = (self.z**(self.n - k)*frac).denominator()
-            if d(0)==0: return False
-
         return True
 
 
@@ -186,14 +187,15 @@ class LinearDifferentialOperator(PlainDifferentialOperator):
         raise PrecisionError("Insufficient precision for the guessing part.")
 
 
-    def right_factor(self, verbose=False):
+    def right_factor(self, verbose=False, ncpus=1):
 
         r"""
         Return either a non-trivial right factor of "self" or the string
         'irreducible' if "self" is irreducible.
-        """
 
-        if self.precision > 20000: raise NotImplementedError
+        The integer "ncpus" is the number of processes used for computing the
+        generalized eigenspaces in invariant_subspace.
+        """
 
         if self.n<2: return 'irreducible'
         if verbose: print("Try to factorize an operator of order " + str(self.n) + ".")
@@ -201,26 +203,43 @@ class LinearDifferentialOperator(PlainDifferentialOperator):
             self.fuchsian_info = self.is_fuchsian()
             if not self.fuchsian_info: print("WARNING: The operator is not fuchsian: termination is not guaranteed.")
 
-        self.monodromy(self.precision, verbose=verbose)
-        self.precision = self.monodromy_data.precision
-        matrices = self.monodromy_data.matrices
-        if verbose: print("Monodromy computed with precision = " + str(self.precision) + ".")
+        V, reused = None, False
+        while True:
 
-        if matrices==[]:
-            if verbose: print("Any subspace is invariant --> symbolic guessing.")
-            dop = self._symbolic_guessing()
-        else:
-            try:
-                V = invariant_subspace(matrices, verbose=verbose)
+            if self.precision > 20000: raise NotImplementedError
+
+            if V is None:
+                self.monodromy(self.precision, verbose=verbose)
+                self.precision = self.monodromy_data.precision
+                matrices = self.monodromy_data.matrices
+                if verbose: print("Monodromy computed with precision = " + str(self.precision) + ".")
+
+                if matrices==[]:
+                    if verbose: print("Any subspace is invariant --> symbolic guessing.")
+                    return self._symbolic_guessing()
+
+                try:
+                    V = invariant_subspace(matrices, verbose=verbose, ncpus=ncpus)
+                except PrecisionError:
+                    if verbose: print("Insufficient precision.")
+                    self.precision = self.precision<<1
+                    continue
                 if V is None: return 'irreducible'
+                reused = False
                 if verbose: print("Find an invariant subspace of dimension " + str(len(V)) + " --> guessing.")
-                dop = self._guessing(V[0], len(V))
-            except PrecisionError:
-                if verbose: print("Insufficient precision.")
-                self.precision = self.precision<<1
-                return self.right_factor(verbose=verbose)
 
-        return dop
+            try:
+                return self._guessing(V[0], len(V))
+            except PrecisionError:
+                # _guessing has already doubled the order of truncation: if V is
+                # still precise enough, it is tried once more with this order
+                acc = customized_accuracy(V[0])
+                if not reused and acc>=50 and 4*acc>=3*self.precision:
+                    if verbose: print("Insufficient order of truncation.")
+                    reused = True
+                else:
+                    if verbose: print("Insufficient precision.")
+                    V, self.precision = None, self.precision<<1
 
 
     def euler_rep(self):
@@ -254,11 +273,14 @@ def try_rational(dop):
     return False, None
 
 
-def right_factor(dop, verbose=False, hybrid=True):
+def right_factor(dop, verbose=False, hybrid=True, ncpus=1):
 
     r"""
     Return either a non-trivial right factor of "dop" or the string
     'irreducible' if "dop" is irreducible.
+
+    If 'ncpus>1' is specified, some linear algebra computations are distributed
+    over "ncpus" processes.
     """
 
     if dop.order()<2: return 'irreducible'
@@ -268,27 +290,32 @@ def right_factor(dop, verbose=False, hybrid=True):
         success, rfactor = try_series(dop)
         if success: return rfactor
 
-    coeffs, z0, z = dop.monic().coefficients(), QQ.zero(), dop.base_ring().gen()
-    while min(c.valuation(z - z0) for c in coeffs)<0: z0 = z0 + QQ.one()
+    # z0 is an ordinary point iff it is not a pole of the coefficients of dop.monic()
+    z0, z = QQ.zero(), dop.base_ring().gen()
+    den = lcm(c.denominator() for c in dop.monic().coefficients())
+    while den(z0)==0: z0 = z0 + QQ.one()
     shifted_dop = LinearDifferentialOperator(dop.annihilator_of_composition(z + z0))
 
-    output = shifted_dop.right_factor(verbose=verbose)
+    output = shifted_dop.right_factor(verbose=verbose, ncpus=ncpus)
     if output=='irreducible': return 'irreducible'
     output = output.annihilator_of_composition(z - z0)
     return output
 
 
-def factor(dop, verbose=False, hybrid=True):
+def factor(dop, verbose=False, hybrid=True, ncpus=1):
 
     r"""
     Return a list of irreductible operators [L1, L2, ..., Lr] such that L is
     equal to the composition L1.L2...Lr.
+
+    If 'ncpus>1' is specified, some linear algebra computations are distributed
+    over "ncpus" processes.
     """
 
-    rfactor = right_factor(dop, verbose=verbose, hybrid=hybrid)
+    rfactor = right_factor(dop, verbose=verbose, hybrid=hybrid, ncpus=ncpus)
     if rfactor=='irreducible': return [dop]
     lfactor = dop//rfactor
-    return factor(lfactor, verbose=verbose, hybrid=hybrid) + factor(rfactor, verbose=verbose, hybrid=hybrid)
+    return factor(lfactor, verbose=verbose, hybrid=hybrid, ncpus=ncpus) + factor(rfactor, verbose=verbose, hybrid=hybrid, ncpus=ncpus)
 
 
 
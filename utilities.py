@@ -1,5 +1,6 @@
 from sage.rings.real_mpfr import RealField
 from sage.rings.rational_field import QQ
+from sage.rings.integer_ring import ZZ
 from sage.rings.qqbar import QQbar
 from sage.matrix.matrix_dense import Matrix_dense
 from sage.modules.free_module_element import FreeModuleElement_generic_dense
@@ -11,6 +12,7 @@ from sage.matrix.constructor import matrix
 from sage.functions.other import floor
 from sage.functions.log import log
 from sage.arith.misc import algdep
+from sage.arith.functions import lcm
 
 from ore_algebra.analytic.accuracy import PrecisionError
 
@@ -65,19 +67,32 @@ def power_series_coerce(x, S):
     if isinstance(x, list):
         return [power_series_coerce(y, S) for y in x]
 
-    result = S.zero()
+    # the coefficients are gathered in a list instead of summing monomials
+    l = []
     for c, mon in x:
         if c!=0:
-            result += c*S.gen()**mon.n
+            e = ZZ(mon.n)
+            if e>=len(l): l.extend([0]*(e + 1 - len(l)))
+            l[e] += c
+    result = S(l)
 
     return result
 
 def derivatives(f, m):
 
+    r"""
+    Return the list [f, f', ..., f^(m)] of the first derivatives of the power
+    series "f".
+
+    The coefficients of each derivative are obtained from the previous ones by
+    a shift and a multiplication by an integer.
+    """
+
+    S, c, prec = f.parent(), f.list(), f.prec()
     result = [f]
-    for k in range(m):
-        f = f.derivative()
-        result.append(f)
+    for k in range(1, m + 1):
+        c = [i*c[i] for i in range(1, len(c))]
+        result.append(S(c, prec - k))
 
     return result
 
@@ -90,8 +105,10 @@ def derivatives(f, m):
 
 def _clean(pol):
 
-    l = list(pol)
+    l = pol.list()
+    d = len(l)
     while len(l)>0 and l[-1].contains_zero(): l.pop()
+    if len(l)==d: return pol
     cpol = pol.parent()(l)
 
     return cpol
@@ -131,13 +148,13 @@ def GCD(a, b):
     """
 
     a, b = _clean(a), _clean(b)
-    if a==0: return b
-    if b==0: return a
-    if a.degree() < b.degree(): return GCD(b, a)
+    da, db = a.degree(), b.degree()
+    if da < db: a, b, db = b, a, da
 
-    while b != 0:
-        a, b = b, a.quo_rem(b)[1]
-        b = _clean(b)
+    # after cleaning, b is zero iff it has degree -1
+    while db >= 0:
+        a, b = b, _clean(a.quo_rem(b)[1])
+        db = b.degree()
 
     return a
 
@@ -195,8 +212,8 @@ def XGCD(a, b):
         u0, v0, u1, v1 = u1, v1, u0 - q*u1, v0 - q*v1
         r1 = _clean(r1)
 
-    lc = r0.leading_coefficient()
-    d, u, v = r0.monic(), _clean(u0/lc), _clean(v0/lc)
+    inv = ~r0.leading_coefficient()
+    d, u, v = r0.monic(), _clean(inv*u0), _clean(inv*v0)
 
     return d, u, v
 
@@ -393,21 +410,60 @@ def guess_rational_numbers(x, p=None):
 
     """
 
+    r, _ = _guess_rational_numbers(x, p, ZZ.one())
+
+    return r
+
+
+
+def _guess_rational_numbers(x, p, den):
+
+    r"""
+    Return the output of guess_rational_numbers(x, p=p) together with the lcm
+    of "den" and of the denominators found, so that a single denominator is
+    shared over the whole structure "x".
+    """
+
     if isinstance(x, list) :
-        return [guess_rational_numbers(c, p=p) for c in x]
+        r = []
+        for c in x:
+            q, den = _guess_rational_numbers(c, p, den)
+            r.append(q)
+        return r, den
 
     if isinstance(x, FreeModuleElement_generic_dense) or isinstance(x, Matrix_dense) or isinstance(x, Polynomial):
-        return x.parent().change_ring(QQ)(guess_rational_numbers(x.list(), p=p))
+        r, den = _guess_rational_numbers(x.list(), p, den)
+        return x.parent().change_ring(QQ)(r), den
+
+    q = _guess_rational_number(x, p=p, den=den)
+
+    return q, lcm(den, q.denominator())
+
+
+
+def _guess_rational_number(x, p=None, den=1):
+
+    r"""
+    Guess a rational number for the complex number "x".
+
+    If "den" is a likely denominator, x*den is first rounded to an integer.
+    Since rationals of denominators at most den are at least 1/den^2 apart,
+    this gives the output of nearby_rational as soon as 2*eps*den^2 < 1.
+    """
 
     if p is None:
         eps = x.parent().eps
-        p = floor(-log(eps, 2))
     else:
         eps = RealField(30).one() >> p
     if not x.imag().above_abs().mid()<eps:
         raise PrecisionError('This number does not seem a rational number.')
     x = x.real().mid()
 
+    if 2*eps*den**2 < 1:
+        y = x*den
+        num = y.round()
+        if abs(y - num) <= eps*den: return QQ(num)/den
+
     return x.nearby_rational(max_error=x.parent()(eps))
 
 